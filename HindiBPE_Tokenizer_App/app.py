@@ -103,7 +103,7 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Load the tokenizer
-@st.cache_resource
+@st.cache_resource(show_spinner=False, max_entries=1)
 def load_tokenizer():
     tokenizer = HindiBPE(vocab_size=5000, min_freq=2)
     try:
@@ -1,9 +1,8 @@
 from collections import Counter
-import matplotlib.pyplot as plt
 import json
 from hindi_bpe_scratch import HindiBPE
 
-def analyze_tokenizer(model_path: str, test_file: str):
+def analyze_tokenizer(model_path: str, test_file: str, plot: bool = True):
     """Analyze tokenizer performance and generate statistics"""
     tokenizer = HindiBPE()
     tokenizer.load(model_path)
@@ -16,14 +15,15 @@ def analyze_tokenizer(model_path: str, test_file: str):
     tokens = tokenizer.encode(text)
     token_freqs = Counter(tokens)
     
-    # Plot token frequency distribution
-    plt.figure(figsize=(12, 6))
-    plt.plot(range(len(token_freqs)), sorted(token_freqs.values(), reverse=True))
-    plt.title('Token Frequency Distribution')
-    plt.xlabel('Token Rank')
-    plt.ylabel('Frequency')
-    plt.yscale('log')
-    plt.savefig('token_distribution.png')
+    # Plot token frequency distribution (matplotlib is only imported when plotting)
+    if plot:
+        import matplotlib.pyplot as plt
+        plt.figure(figsize=(12, 6))
+        plt.semilogy(range(len(token_freqs)), sorted(token_freqs.values(), reverse=True))
+        plt.title('Token Frequency Distribution')
+        plt.xlabel('Token Rank')
+        plt.ylabel('Frequency')
+        plt.savefig('token_distribution.png')
     
     # Save detailed statistics
     stats = {
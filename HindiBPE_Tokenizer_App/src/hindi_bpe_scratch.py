@@ -1,52 +1,69 @@
-import torch
 from collections import defaultdict, Counter
+import heapq
+import mmap
+from concurrent.futures import ProcessPoolExecutor
 import re
+import sys
 import json
-from typing import Dict, List, Tuple, Set
+from operator import itemgetter
+from typing import Dict, List, Tuple, Set, Iterator
 from tqdm.auto import tqdm
 import unicodedata
 import os
 import pickle
-import numpy as np
+
+_WORKER_BPE = None
+
+def _init_worker(tokenizer):
+    """Give each tokenization worker its own copy of the tokenizer"""
+    global _WORKER_BPE
+    _WORKER_BPE = tokenizer
+
+def _tokenize_word_worker(word: str) -> Tuple[str, ...]:
+    return tuple(_WORKER_BPE._tokenize_word(word))
 
 class HindiBPE:
+    # Normalization patterns, compiled once
+    _RE_WS = re.compile(r'\s+')
+    _RE_DASH = re.compile(r'[-_]+')
+    _RE_DOTS = re.compile(r'\.{2,}')
+    _RE_SPACE_PUNCT = re.compile(r'\s+([।?!,])')
+    
+    # Verb endings boosted during training
+    _VERB_SUFFIXES = ("ना", "ता", "ते", "ती", "गा", "गी", "या", "ये", "कर")
+    
+    # Maximum number of words memoized by _tokenize_word_cached
+    _WORD_CACHE_SIZE = 200_000
+    
     def __init__(self, vocab_size: int = 8000, min_freq: int = 2):
         self.vocab_size = vocab_size
         self.min_freq = min_freq
         self.vocab = {}
         self.merges = {}
         
-        current_id = 0
-        
         # First initialize with ASCII characters (0-255)
         for i in range(256):
             self.vocab[chr(i)] = i
-            current_id = i + 1
         
         # Add special tokens
         self.special_tokens = ["[UNK]", "[PAD]", "[BOS]", "[EOS]"]
         for token in self.special_tokens:
-            self.vocab[token] = current_id
-            current_id += 1
+            self._add_token(token)
         
         # Add Hindi punctuation with unique IDs
         for punct in ["।", "?", "!", ","]:
-            if punct not in self.vocab:
-                self.vocab[punct] = current_id
-                current_id += 1
+            self._add_token(punct)
         
         # Add common complete words
-        self.common_words = {
+        self.common_words = set(map(sys.intern, {
             "में", "का", "की", "के", "है", "से", "को", "और", "ने", "पर",
             "कर", "था", "थी", "थे", "हैं", "गया", "गयी", "गये", "रहा", "रही",
             "एक", "यह", "वह", "कि", "जो", "तो", "भी", "हो", "कुछ", "अब",
             "लिए", "साथ", "बाद","लिया", "गये", "दिया", "करने", "किया", "होता", "करते",
             "बात", "लोग", "काम", "देश", "समय", "दिन", "कहा", "होने", "बार", "जाता"
-        }
+        }))
         for word in self.common_words:
-            if word not in self.vocab:  # Only add if not already in ASCII range
-                self.vocab[word] = current_id
-                current_id += 1
+            self._add_token(word)
         
         # Finally add Hindi characters
         self.base_chars = set("अआइईउऊऋएऐओऔकखगघङचछजझञटठडढणतथदधनपफबभमयरलवशषसह" + 
@@ -54,16 +71,19 @@ class HindiBPE:
                              "।?!,")
         self.matra_chars = set("ािीुूृेैोौंःँ्")
         self.all_chars = self.base_chars.union(self.matra_chars)
+        self._conjunct_chars = frozenset(self.all_chars - {'्'})
         for char in self.base_chars:
-            if char.strip() and char not in self.vocab:
-                self.vocab[char] = current_id
-                current_id += 1
+            if char.strip():
+                self._add_token(char)
         
         # Common Hindi word endings and prefixes
         self.common_suffixes = ["ों", "ाएं", "ाओं", "ाता", "ाती", "ाते", "ाना", "ाने", "ेगा", "ेगी", 
                                 "कर", "िया", "ियों", "वाला", "वाले", "वाली", "कार", "ता", "त्व", "मान"]
         self.common_prefixes = ["अन", "अध", "उप", "प्र", "सम", "अभि", "परि", "विश", "सर्व",
                                 "महा", "अति", "सु", "कु", "नि", "दुर्", "स्व", "अनु"]
+        # Tuple forms for single-call str.endswith/startswith checks
+        self._suffix_tuple = tuple(self.common_suffixes)
+        self._prefix_tuple = tuple(self.common_prefixes)
         
         # Add normalization mappings
         self.char_mappings = {
@@ -91,6 +111,14 @@ class HindiBPE:
             '\u200d': '',   # Zero width joiner
             '\xa0': ' ',    # Non-breaking space
         }
+        # Single-character mappings are applied in one pass with str.translate;
+        # identity mappings are dropped
+        self._single_trans = str.maketrans({k: v for k, v in self.char_mappings.items() if len(k) == 1})
+        self._multi_map = {k: v for k, v in self.char_mappings.items() if len(k) > 1 and k != v}
+        # Multi-character mappings are matched in one pass with an alternation,
+        # longest keys first (an empty alternation would match everywhere)
+        self._multi_re = (re.compile('|'.join(map(re.escape, sorted(self._multi_map, key=len, reverse=True))))
+                          if self._multi_map else None)
         
         # Common Hindi abbreviations
         self.abbreviations = {
@@ -101,88 +129,141 @@ class HindiBPE:
             'प्रो': 'प्रोफेसर',
         }
         
-        # Add common syllable combinations
-        self.syllables = set()
-        for char in self.base_chars:
-            if char in "।?!,":
-                continue
-            # Add base character
-            self.syllables.add(char)
-            # Add character + matra combinations
-            for matra in "ािीुूृेैोौं":
-                self.syllables.add(char + matra)
-            # Add common conjuncts
-            for halant_char in self.base_chars:
-                if halant_char not in "।?!,":
-                    self.syllables.add(char + '्' + halant_char)
+        # Add common syllable combinations: base characters, character + matra
+        # combinations and common conjuncts
+        non_punct = [c for c in self.base_chars if c not in "।?!,"]
+        self.syllables = (set(non_punct) |
+                          {c + m for c in non_punct for m in "ािीुूृेैोौं"} |
+                          {c + '्' + d for c in non_punct for d in non_punct})
         
         # Add syllables to vocab
-        for syllable in self.syllables:
-            if syllable not in self.vocab:
-                self.vocab[syllable] = len(self.vocab)
+        base = len(self.vocab)
+        self.vocab.update({s: base + i for i, s in enumerate(self.syllables.difference(self.vocab))})
+        
+        # Per-instance word -> subwords memo for encode
+        self._word_cache = {}
+        
+        self._build_id_to_token()
+        self._build_decode_pieces()
+        self._build_matcher()
+    
+    def _add_token(self, token: str) -> int:
+        """Append token with the next free id; tokens already in the vocab keep their id"""
+        if token not in self.vocab:
+            self.vocab[token] = len(self.vocab)
+        return self.vocab[token]
+    
+    def _build_matcher(self):
+        """Index known tokens and all their prefixes for longest-match lookup"""
+        known = set(self.vocab) | self.common_words | self.syllables
+        self._known_tokens = frozenset(known)
+        self._token_prefixes = frozenset(token[:j] for token in known for j in range(1, len(token) + 1))
+    
+    def _build_id_to_token(self):
+        """Build the dense id -> token list used by decode"""
+        id_to_token = ['[UNK]'] * (max(self.vocab.values()) + 1)
+        for token, idx in self.vocab.items():
+            id_to_token[idx] = token
+        self.id_to_token = id_to_token
+    
+    def _decode_piece(self, token: str) -> str:
+        """Text decode emits for a token, with a leading space unless it attaches
+        to the previous token (punctuation, matras, halant, special tokens)"""
+        if (token in ["।", "?", "!", ","] or token in "ािीुूृेैोौंँःृ्" or
+                token in self.special_tokens or token.startswith('्')):
+            return token
+        return ' ' + token
+    
+    def _build_decode_pieces(self):
+        """Precompute the decode output of every id"""
+        self._id_to_piece = [self._decode_piece(token) for token in self.id_to_token]
+        self._unk_piece = self._decode_piece('[UNK]')
         
     def _tokenize_word(self, word: str) -> List[str]:
         word = self._normalize_text(word)
+        vocab = self.vocab
         
         # First check if it's a complete word in vocab
-        if word in self.vocab:
+        if word in vocab:
             return [word]
         
+        # Local references for the per-character loop
+        known = self._known_tokens
+        prefixes = self._token_prefixes
+        conjunct_chars = self._conjunct_chars
+        base_chars = self.base_chars
+        matra_chars = self.matra_chars
+        syllables = self.syllables
+        n = len(word)
+        
+        # Short words: a single character is always its own token, and two
+        # characters split in two whenever the first one is a known token
+        if n <= 1:
+            return list(word)
+        if n == 2:
+            if word in known:
+                return [word]
+            if word[0] in known:
+                return [word[0], word[1]]
+        
         tokens = []
         i = 0
-        while i < len(word):
+        while i < n:
             # Try to match longest possible sequence first
             matched = False
-            max_length = min(len(word) - i, 12)  # Increased from 8 to 12
+            max_length = min(n - i, 12)  # Increased from 8 to 12
             
-            # First try matching complete syllables or words
-            for length in range(max_length, 0, -1):
-                subword = word[i:i+length]
-                
-                # Check if it's a valid token, common word, or known syllable
-                if (subword in self.vocab or 
-                    subword in self.common_words or 
-                    subword in self.syllables):
-                    tokens.append(subword)
-                    i += length
-                    matched = True
+            # First try matching complete syllables or words: the longest valid
+            # token, common word or known syllable, extending the match only
+            # while it is still a prefix of some known token
+            length = 0
+            for end in range(i + 1, i + max_length + 1):
+                subword = word[i:end]
+                if subword not in prefixes:
                     break
-                
-                # Check for valid syllable structure with conjuncts
-                if len(subword) >= 3 and '्' in subword:
-                    parts = subword.split('्')
-                    if all(p in self.base_chars or p in self.matra_chars for p in parts):
-                        tokens.append(subword)
-                        i += length
-                        matched = True
-                        break
+                if subword in known:
+                    length = end - i
+            
+            # Check for valid syllable structure with conjuncts (c्c, c्c्c, ...)
+            if word[i] in conjunct_chars:
+                end = i + 1
+                while (end + 2 <= i + max_length and
+                       word[end] == '्' and word[end + 1] in conjunct_chars):
+                    end += 2
+                if end - i >= 3:
+                    length = max(length, end - i)
+            
+            if length:
+                tokens.append(word[i:i + length])
+                i += length
+                matched = True
             
             if not matched:
                 # Handle consonant clusters with following matras
-                if i < len(word) - 1:
+                if i < n - 1:
                     cluster = word[i]
                     next_pos = i + 1
                     
                     # Collect halant + consonant sequences
-                    while (next_pos < len(word) - 1 and 
+                    while (next_pos < n - 1 and 
                            word[next_pos] == '्' and 
-                           word[next_pos + 1] in self.base_chars):
+                           word[next_pos + 1] in base_chars):
                         cluster += word[next_pos:next_pos + 2]
                         next_pos += 2
                     
                     # Add following matras
-                    while next_pos < len(word) and word[next_pos] in self.matra_chars:
+                    while next_pos < n and word[next_pos] in matra_chars:
                         cluster += word[next_pos]
                         next_pos += 1
                     
-                    if cluster in self.vocab or cluster in self.syllables:
+                    if cluster in vocab or cluster in syllables:
                         tokens.append(cluster)
                         i = next_pos
                     else:
                         # Fallback: add base character with its matras
                         char = word[i]
                         i += 1
-                        while i < len(word) and word[i] in self.matra_chars:
+                        while i < n and word[i] in matra_chars:
                             char += word[i]
                             i += 1
                         tokens.append(char)
@@ -193,6 +274,27 @@ class HindiBPE:
         
         return tokens
     
+    def _tokenize_words(self, words: List[str]) -> Iterator[Tuple[str, ...]]:
+        """Tokenize many words, spreading large batches over worker processes"""
+        if len(words) < 10_000:
+            for word in words:
+                yield tuple(self._tokenize_word(word))
+            return
+        
+        with ProcessPoolExecutor(initializer=_init_worker, initargs=(self,)) as executor:
+            yield from executor.map(_tokenize_word_worker, words, chunksize=1024)
+    
+    def _tokenize_word_cached(self, word: str) -> Tuple[str, ...]:
+        """Memoized _tokenize_word, must be cleared whenever the vocab changes"""
+        cache = self._word_cache
+        tokens = cache.get(word)
+        if tokens is None:
+            # Start over rather than grow without bound
+            if len(cache) >= self._WORD_CACHE_SIZE:
+                cache.clear()
+            tokens = cache[word] = tuple(self._tokenize_word(word))
+        return tokens
+    
     def _normalize_text(self, text: str) -> str:
         """Enhanced normalization for Hindi text"""
         # 1. Basic cleanup
@@ -201,130 +303,169 @@ class HindiBPE:
         # 2. NFKC normalization
         text = unicodedata.normalize('NFKC', text)
         
-        # 3. Replace variations with standard forms
-        for old, new in self.char_mappings.items():
-            text = text.replace(old, new)
+        # 3. Replace variations with standard forms. Multi-character ones are
+        #    applied first; this matches applying char_mappings in order because
+        #    no single-character replacement can produce a nukta sequence
+        if self._multi_re is not None:
+            text = self._multi_re.sub(lambda m: self._multi_map[m.group()], text)
+        text = text.translate(self._single_trans)
         
         # 4. Normalize spaces only
-        text = re.sub(r'\s+', ' ', text)  # Multiple spaces to single space
+        text = self._RE_WS.sub(' ', text)  # Multiple spaces to single space
         text = text.strip()  # Remove leading/trailing spaces
-        text = re.sub(r'[-_]+', '-', text)
-        text = re.sub(r'[""'']', '"', text)
-        text = re.sub(r'\.{2,}', '...', text)
+        text = self._RE_DASH.sub('-', text)
+        # Curly quotes are left as they are: the shipped model was trained with them
+        text = self._RE_DOTS.sub('...', text)
         
         return text
     
-    def _get_stats(self, words: Dict[str, int]) -> Dict[Tuple[str, str], int]:
-        pairs_dict = {}
+    def _pair_boost(self, pair: Tuple[str, str]) -> int:
+        """Linguistic boost applied to the raw frequency of a pair"""
+        combined = ''.join(pair)
         
-        for word, freq in words.items():
-            symbols = word.split()
-            if len(symbols) < 2:
-                continue
-            
-            for j in range(len(symbols) - 1):
-                pair = (symbols[j], symbols[j + 1])
-                combined = ''.join(pair)
-                
-                # Enhanced boosting strategy
-                boost = 1
-                
-                # Boost complete words
-                if combined in self.common_words:
-                    boost = 20
-                # Boost for syllables with matras
-                elif any(c in self.matra_chars for c in combined):
-                    boost = 15
-                # Boost for verb forms
-                elif any(combined.endswith(suffix) for suffix in ["ना", "ता", "ते", "ती", "गा", "गी", "या", "ये", "कर"]):
-                    boost = 12
-                # Boost for common suffixes
-                elif any(combined.endswith(suffix) for suffix in self.common_suffixes):
-                    boost = 10
-                # Boost for common prefixes
-                elif any(combined.startswith(prefix) for prefix in self.common_prefixes):
-                    boost = 8
-                # Boost for consonant clusters
-                elif '्' in combined:
-                    boost = 6
-                
-                pairs_dict[pair] = pairs_dict.get(pair, 0) + freq * boost
+        # Boost complete words
+        if combined in self.common_words:
+            return 20
+        # Boost for syllables with matras
+        if not self.matra_chars.isdisjoint(combined):
+            return 15
+        # Boost for verb forms (str.endswith/startswith accept a tuple and
+        # check every entry in C)
+        if combined.endswith(self._VERB_SUFFIXES):
+            return 12
+        # Boost for common suffixes
+        if combined.endswith(self._suffix_tuple):
+            return 10
+        # Boost for common prefixes
+        if combined.startswith(self._prefix_tuple):
+            return 8
+        # Boost for consonant clusters
+        if '्' in combined:
+            return 6
+        return 1
+    
+    def _get_stats(self, words: List[Tuple[str, ...]], freqs: List[int]) -> Tuple[Dict[Tuple[str, str], int], Dict[Tuple[str, str], Set[int]]]:
+        """Count adjacent symbol pairs and index the words each pair occurs in"""
+        pair_counts = defaultdict(int)
+        pair_to_words = defaultdict(set)
+        
+        for word_id, (symbols, freq) in enumerate(zip(words, freqs)):
+            for pair in zip(symbols, symbols[1:]):
+                pair_counts[pair] += freq
+                pair_to_words[pair].add(word_id)
         
-        return pairs_dict
+        return dict(pair_counts), pair_to_words
     
-    def _merge_pair(self, pair: Tuple[str, str], words: Dict[str, int]) -> Dict[str, int]:
-        """Optimized batch merge operation"""
-        new_words = {}
-        replacement = ''.join(pair)
-        batch_size = 1000
-        
-        # Convert to arrays for faster processing
-        items = list(words.items())
-        for i in range(0, len(items), batch_size):
-            batch = items[i:min(i+batch_size, len(items))]
-            word_list, freq_list = zip(*batch)
-            
-            # Process batch
-            for word, freq in zip(word_list, freq_list):
-                if freq < self.min_freq:
-                    continue
-                    
-                parts = word.split()
-                if len(parts) < 2:
-                    new_words[word] = freq
-                    continue
-                
-                # Fast string join and split
-                new_word = ' '.join(parts).replace(f"{pair[0]} {pair[1]}", replacement)
-                new_words[new_word] = freq
+    def _merge_pair(self, pair: Tuple[str, str], symbols: Tuple[str, ...], freq: int,
+                    deltas: Dict[Tuple[str, str], int]) -> Tuple[str, ...]:
+        """Merge every occurrence of pair in one word, recording pair count changes in deltas"""
+        first, second = pair
+        merged = sys.intern(first + second)
+        new_symbols = []
+        n = len(symbols)
+        i = 0
+        while i < n:
+            if i < n - 1 and symbols[i] == first and symbols[i + 1] == second:
+                deltas[pair] -= freq
+                # Left neighbour (prev, first) becomes (prev, merged)
+                if i > 0:
+                    deltas[(symbols[i - 1], first)] -= freq
+                    deltas[(new_symbols[-1], merged)] += freq
+                # Right neighbour (second, next) becomes (merged, next), unless
+                # next starts another merge site, which then handles it as its left
+                if i + 2 < n and not (i + 3 < n and symbols[i + 2] == first and symbols[i + 3] == second):
+                    deltas[(second, symbols[i + 2])] -= freq
+                    deltas[(merged, symbols[i + 2])] += freq
+                new_symbols.append(merged)
+                i += 2
+            else:
+                new_symbols.append(symbols[i])
+                i += 1
         
-        return new_words
+        return tuple(new_symbols)
     
-    def train(self, input_file: str, batch_size: int = 10000):
-        """Optimized training with parallel processing and improved merging strategy"""
-        # Load and preprocess text in larger batches
-        words = []
-        with open(input_file, 'r', encoding='utf-8') as f:
-            text = f.read()
-            words = text.split()
-        
-        # Process in larger batches
+    def train(self, input_file: str):
+        """Optimized training with incremental pair statistics and improved merging strategy"""
+        # Stream the corpus line by line so memory stays bounded by the word counts
         word_freqs = Counter()
-        for i in range(0, len(words), batch_size):
-            batch = words[i:i + batch_size]
-            word_freqs.update(batch)
+        with open(input_file, 'r', encoding='utf-8', buffering=1 << 20) as f:
+            for line in f:
+                word_freqs.update(line.split())
+        
+        # Initialize corpus with symbol sequences
+        candidates = [(word, freq) for word, freq in word_freqs.items() if freq >= self.min_freq]
+        rest = []
+        for word, freq in candidates:
+            # Try to keep common words intact
+            if word in self.common_words or freq > self.min_freq * 5:
+                self._add_token(word)
+            else:
+                rest.append((word, freq))
         
-        # Initialize vocabulary with character sequences
+        # Tokenize the remaining words against the vocab built so far
+        self._build_matcher()
         vocab = {}
-        with tqdm(total=len(word_freqs), desc="Processing words") as pbar:
-            # Process most frequent words first
-            for word, freq in word_freqs.most_common():
-                if freq >= self.min_freq:
-                    # Try to keep common words intact
-                    if word in self.common_words or freq > self.min_freq * 5:
-                        if word not in self.vocab:
-                            self.vocab[word] = len(self.vocab)
-                    else:
-                        chars = ' '.join(self._tokenize_word(word))
-                        vocab[chars] = freq
-                    pbar.update(1)
+        tokenized = self._tokenize_words([word for word, _ in rest])
+        intern = sys.intern
+        # The generator goes first so it runs to completion and the worker pool
+        # shuts down before the merge phase
+        for chars, (word, freq) in zip(tqdm(tokenized, total=len(rest), desc="Processing words"), rest):
+            # One shared object per symbol, so symbol comparisons in _merge_pair
+            # usually succeed on identity
+            chars = tuple(map(intern, chars))
+            vocab[chars] = vocab.get(chars, 0) + freq
+        # Single-symbol words have no pairs and can never be merged, so they are
+        # left out of the active set
+        active = [(chars, freq) for chars, freq in vocab.items() if len(chars) > 1]
+        words = [chars for chars, _ in active]
+        freqs = [freq for _, freq in active]
+        
+        # Pair counts are computed once and then updated incrementally after each
+        # merge, touching only the words that contain the merged pair
+        pair_counts, pair_to_words = self._get_stats(words, freqs)
+        boosts = {}
+        
+        def score(pair):
+            if pair not in boosts:
+                boosts[pair] = self._pair_boost(pair)
+            return pair_counts.get(pair, 0) * boosts[pair]
+        
+        # Max-heap of (-score, pair); entries whose score no longer matches are stale
+        heap = [(-score(pair), pair) for pair in pair_counts]
+        heapq.heapify(heap)
+        
+        suffixes = self._suffix_tuple
+        prefixes = self._prefix_tuple
         
         # BPE training with improved merging strategy
         num_merges = self.vocab_size - len(self.vocab)
         with tqdm(total=num_merges, desc="Training BPE") as pbar:
             while len(self.vocab) < self.vocab_size:
-                pairs = self._get_stats(vocab)
-                if not pairs:
-                    break
+                # Rebuild the heap once stale entries outnumber the live pairs
+                if len(heap) > 2 * len(pair_counts) + 1024:
+                    heap = [(-score(pair), pair) for pair in pair_counts]
+                    heapq.heapify(heap)
+                
+                # Pop the top 50 live pairs, then put them back for later iterations
+                top = []
+                seen = set()
+                while heap and len(top) < 50:
+                    neg_score, pair = heapq.heappop(heap)
+                    current = score(pair)
+                    if pair in seen or current <= 0 or current != -neg_score:
+                        continue
+                    seen.add(pair)
+                    top.append((pair, current))
+                for pair, freq in top:
+                    heapq.heappush(heap, (-freq, pair))
                 
                 # Get best pairs considering frequency and length
                 best_pairs = []
-                for pair, freq in sorted(pairs.items(), key=lambda x: x[1], reverse=True)[:50]:
+                for pair, freq in top:
                     merged = ''.join(pair)
                     # Prioritize longer sequences that form meaningful units
-                    if (len(merged) > 3 and 
-                        any(merged.endswith(suffix) for suffix in self.common_suffixes) or
-                        any(merged.startswith(prefix) for prefix in self.common_prefixes) or
+                    if (len(merged) > 3 and merged.endswith(suffixes) or
+                        merged.startswith(prefixes) or
                         '्' in merged):
                         best_pairs.append((pair, freq))
                     if len(best_pairs) >= 10:
@@ -338,11 +479,50 @@ class HindiBPE:
                     if len(self.vocab) >= self.vocab_size:
                         break
                     merged_token = ''.join(best_pair)
+                    
+                    # Rewrite only the words containing the pair. This also runs when
+                    # the token already exists, so the pair cannot be selected again.
+                    changed = set()
+                    for word_id in pair_to_words.pop(best_pair, ()):
+                        deltas = defaultdict(int)
+                        symbols = self._merge_pair(best_pair, words[word_id], freqs[word_id], deltas)
+                        words[word_id] = symbols
+                        remaining = None
+                        for pair, delta in deltas.items():
+                            if not delta:
+                                continue
+                            count = pair_counts.get(pair, 0) + delta
+                            if count > 0:
+                                pair_counts[pair] = count
+                            else:
+                                pair_counts.pop(pair, None)
+                            if delta > 0:
+                                pair_to_words[pair].add(word_id)
+                            elif pair in pair_to_words:
+                                # Keep the index exact: drop the word from pairs it
+                                # no longer contains so it is never rescanned
+                                if remaining is None:
+                                    remaining = set(zip(symbols, symbols[1:]))
+                                if pair not in remaining:
+                                    word_ids = pair_to_words[pair]
+                                    word_ids.discard(word_id)
+                                    if not word_ids:
+                                        del pair_to_words[pair]
+                            changed.add(pair)
+                    for pair in changed:
+                        if pair in pair_counts:
+                            heapq.heappush(heap, (-score(pair), pair))
+                    
                     if merged_token not in self.vocab:
-                        vocab = self._merge_pair(best_pair, vocab)
-                        self.vocab[merged_token] = len(self.vocab)
-                        self.merges[best_pair] = len(self.vocab) - 1
+                        self.merges[best_pair] = self._add_token(merged_token)
                         pbar.update(1)
+        
+        # Interned keys let lookups with equal interned strings match by identity
+        self.vocab = {sys.intern(token): idx for token, idx in self.vocab.items()}
+        self._build_id_to_token()
+        self._build_decode_pieces()
+        self._build_matcher()
+        self._word_cache.clear()
     
 
     
@@ -353,62 +533,92 @@ class HindiBPE:
             'merges': self.merges,
             'special_tokens': self.special_tokens,
             'vocab_size': self.vocab_size,
-            'min_freq': self.min_freq
+            'min_freq': self.min_freq,
+            'id_to_token': self.id_to_token
         }
         with open(path, 'wb') as f:
-            pickle.dump(data, f)
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
     
     def load(self, path: str):
         """Load tokenizer from file"""
-        with open(path, 'rb') as f:
-            data = pickle.load(f)
-        self.vocab = data['vocab']
-        self.merges = data['merges']
+        # Unpickle straight from a read-only memory map of the file
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            data = pickle.loads(mm)
+        self.vocab = {sys.intern(token): idx for token, idx in data['vocab'].items()}
+        self.merges = {(sys.intern(first), sys.intern(second)): idx
+                       for (first, second), idx in data['merges'].items()}
         self.special_tokens = data['special_tokens']
         self.vocab_size = data.get('vocab_size', 5000)  # Default to 5000 if not found
         self.min_freq = data.get('min_freq', 2)
+        # Older models don't store the reverse vocab
+        if 'id_to_token' in data:
+            self.id_to_token = data['id_to_token']
+        else:
+            self._build_id_to_token()
+        self._build_decode_pieces()
+        self._build_matcher()
+        self._word_cache.clear()
+    
+    def _split_long_word(self, word: str, size: int = 256) -> List[str]:
+        """Split a long word into windows of at most size characters, cutting only
+        where a new grapheme cluster starts"""
+        pieces = []
+        start = 0
+        while len(word) - start > size:
+            # Move the cut back so matras, nukta and halant conjuncts stay whole
+            cut = start + size
+            while cut > start and (unicodedata.category(word[cut]).startswith('M') or
+                                   word[cut - 1] == '्'):
+                cut -= 1
+            if cut == start:
+                cut = start + size
+            pieces.append(word[start:cut])
+            start = cut
+        pieces.append(word[start:])
+        return pieces
     
     def encode(self, text: str) -> List[int]:
         tokens = []
+        append = tokens.append
+        vocab = self.vocab
+        unk_id = vocab['[UNK]']
         text = self._normalize_text(text)
         words = text.split()
         
         for word in words:
             # First try the complete word
-            if word in self.vocab:
-                tokens.append(self.vocab[word])
+            word_id = vocab.get(word)
+            if word_id is not None:
+                append(word_id)
                 continue
             
-            # Tokenize the word into subwords
-            word_tokens = self._tokenize_word(word)
-            for token in word_tokens:
-                if token in self.vocab:
-                    tokens.append(self.vocab[token])
-                else:
-                    tokens.append(self.vocab['[UNK]'])
+            # Tokenize the word into subwords; very long words (e.g. pasted text
+            # without spaces) are split into windows first
+            pieces = self._split_long_word(word) if len(word) > 512 else (word,)
+            for piece in pieces:
+                for token in self._tokenize_word_cached(piece):
+                    append(vocab.get(token, unk_id))
         
         return tokens
     
     def decode(self, ids: List[int]) -> str:
         """Decode token IDs to text"""
-        id_to_token = {v: k for k, v in self.vocab.items()}
+        if not ids:
+            return ''
         
-        result = []
-        for id in ids:
-            token = id_to_token.get(id, '[UNK]')
-            
-            if token in ["।", "?", "!", ","] or token in "ािीुूृेैोौंँःृ्":
-                result.append(token)
-            elif token in self.special_tokens:
-                result.append(token)
-            else:
-                if result and not token.startswith('्') and not token in "ािीुूृेैोौंँःृ्":
-                    result.append(' ')
-                result.append(token)
+        pieces = self._id_to_piece
+        if min(ids) < 0 or max(ids) >= len(pieces):
+            unk = self._unk_piece
+            decoded = ''.join([pieces[id] if 0 <= id < len(pieces) else unk for id in ids])
+        elif len(ids) > 1:
+            # Gather all pieces in a single C-level call
+            decoded = ''.join(itemgetter(*ids)(pieces))
+        else:
+            decoded = pieces[ids[0]]
         
-        decoded = ''.join(result).strip()
-        decoded = re.sub(r'\s+', ' ', decoded)
-        decoded = re.sub(r'\s+([।?!,])', r'\1', decoded)
+        decoded = decoded.strip()
+        decoded = self._RE_WS.sub(' ', decoded)
+        decoded = self._RE_SPACE_PUNCT.sub(r'\1', decoded)
         
         return decoded
     
@@ -1,44 +1,54 @@
 from src.hindi_bpe_scratch import HindiBPE
 import os
+import multiprocessing as mp
 from collections import Counter
-import matplotlib.pyplot as plt
 import json
-import torch
 from tqdm import tqdm
 import re
-from itertools import islice
-import pickle
-from typing import List
+
+_TOK = None
+
+def _init_worker(tokenizer):
+    """Give each analysis worker its own copy of the tokenizer"""
+    global _TOK
+    _TOK = tokenizer
+
+def _encode_line(line):
+    tokens = _TOK.encode(line)
+    words = line.split()
+    return len(line), tokens, sum(map(len, words)), len(words)
 
 def analyze_and_save_results(tokenizer, input_file, batch_size=1000):
     """Analyze tokenizer results with expanded statistics"""
     stats = {}
     token_freqs = Counter()
-    word_lengths = []
-    tokens_per_line = []
     total_chars = 0
+    total_word_chars = 0
+    num_words = 0
+    num_lines = 0
     
     # Get vocabulary statistics
     stats['vocab_size'] = len(tokenizer.vocab)
     
-    # Process text and get token frequencies
-    with open(input_file, 'r', encoding='utf-8') as f:
-        # Process line by line to avoid memory issues
-        for line in tqdm(f, desc="Analyzing tokens"):
-            if line.strip():
-                total_chars += len(line)
-                tokens = tokenizer.encode(line)
-                token_freqs.update(tokens)
-                tokens_per_line.append(len(tokens))
-                word_lengths.extend(len(word) for word in line.split())
+    # Process text and get token frequencies, encoding lines in parallel
+    with open(input_file, 'r', encoding='utf-8') as f, \
+            mp.Pool(os.cpu_count(), initializer=_init_worker, initargs=(tokenizer,)) as pool:
+        lines = (line for line in f if line.strip())
+        for n_chars, tokens, word_chars, n_words in tqdm(pool.imap(_encode_line, lines, chunksize=256),
+                                             desc="Analyzing tokens"):
+            total_chars += n_chars
+            token_freqs.update(tokens)
+            total_word_chars += word_chars
+            num_words += n_words
+            num_lines += 1
     
     # Calculate statistics with safety checks
     total_tokens = sum(token_freqs.values())
     stats['total_tokens'] = total_tokens
     stats['unique_tokens'] = len(token_freqs)
     stats['compression_ratio'] = total_chars / total_tokens if total_tokens > 0 else 0
-    stats['avg_tokens_per_line'] = sum(tokens_per_line) / len(tokens_per_line) if tokens_per_line else 0
-    stats['avg_word_length'] = sum(word_lengths) / len(word_lengths) if word_lengths else 0
+    stats['avg_tokens_per_line'] = total_tokens / num_lines if num_lines else 0
+    stats['avg_word_length'] = total_word_chars / num_words if num_words else 0
     stats['top_tokens'] = {str(k): v for k, v in token_freqs.most_common(100)}
     
     # Save detailed results